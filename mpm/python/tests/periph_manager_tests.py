@@ -0,0 +1,148 @@
+"""
+Tests related to usrp_mpm.periph_manager
+"""
+
+from base_tests import TestBase
+import os
+import tempfile
+from unittest import mock
+from usrp_mpm.mpmlog import get_main_logger
+from usrp_mpm.periph_manager.base import PeriphManagerBase
+from usrp_mpm.sys_utils import udev
+
+XBAR_SYSFS_PATH = '/sys/class/rfnoc_crossbar/crossbar0'
+
+class MockPeriphManager(PeriphManagerBase):
+    """
+    Minimal periph manager without any EEPROMs, overlays, or dboards, so it
+    can be instantiated without the actual hardware.
+    """
+    pids = {0x4242: 'mock'}
+    mboard_info = {"type": "mock"}
+
+
+class TestPeriphManagerBase(TestBase):
+    """
+    Tests for the resources cached by PeriphManagerBase (crossbar file
+    descriptors, the dboard init thread pool, udev lookups), and for
+    releasing them in tear_down().
+
+    The crossbar sysfs node gets redirected to a temporary directory.
+    """
+    @classmethod
+    def setUpClass(cls):
+        # The periph manager logs through the main logger
+        get_main_logger(use_console=False, use_logbuf=False)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self._write_xbar_attr('nports', '16\n')
+        self._write_xbar_attr('local_addr', '')
+        real_os_open = os.open
+        def os_open(path, *args, **kwargs):
+            " Redirects opening the crossbar sysfs node to tmp_dir "
+            if path == XBAR_SYSFS_PATH:
+                path = self.tmp_dir.name
+            return real_os_open(path, *args, **kwargs)
+        os_open_patcher = mock.patch('os.open', side_effect=os_open)
+        self.os_open = os_open_patcher.start()
+        self.addCleanup(os_open_patcher.stop)
+        self.mgr = MockPeriphManager()
+        self.mgr.init_dboards({})
+        self.addCleanup(self.mgr.tear_down)
+
+    def _write_xbar_attr(self, attr, value):
+        """
+        Write value to the fake crossbar sysfs attribute attr.
+        """
+        with open(os.path.join(self.tmp_dir.name, attr), 'w') as attr_file:
+            attr_file.write(value)
+
+    def _read_xbar_attr(self, attr):
+        """
+        Read back the fake crossbar sysfs attribute attr.
+        """
+        with open(os.path.join(self.tmp_dir.name, attr), 'r') as attr_file:
+            return attr_file.read()
+
+    def _get_xbar_fds(self):
+        """
+        Return all crossbar file descriptors the periph manager holds.
+        """
+        return list(self.mgr._xbar_fds.values()) + \
+            list(self.mgr._xbar_dir_fds.values())
+
+    def _assert_closed(self, fd):
+        """
+        Assert that the file descriptor fd is no longer open.
+        """
+        with self.assertRaises(OSError):
+            os.fstat(fd)
+
+    @TestBase.skipUnlessOnLinux()
+    def test_get_num_blocks_cached(self):
+        """
+        Test that get_num_blocks() only reads nports once per session, and
+        that the crossbar file descriptors get reused.
+        """
+        self.assertEqual(self.mgr.get_num_blocks(0), 16)
+        self.assertEqual(self.os_open.call_count, 2)
+        nports_fd = self.mgr._get_xbar_fd(0, 'nports', os.O_RDONLY)
+        self._write_xbar_attr('nports', '8\n')
+        self.assertEqual(self.mgr.get_num_blocks(0), 16)
+        # A new session may run with a new FPGA image, so it re-reads nports,
+        # but through the same file descriptor
+        self.assertTrue(self.mgr.init({}))
+        self.assertEqual(self.mgr.get_num_blocks(0), 8)
+        self.assertEqual(
+            self.mgr._get_xbar_fd(0, 'nports', os.O_RDONLY), nports_fd)
+        self.assertEqual(self.os_open.call_count, 2)
+        # Other attributes of the same crossbar share the directory fd
+        self.mgr.set_xbar_local_addr(0, 0x2)
+        self.assertEqual(self._read_xbar_attr('local_addr'), '0x2')
+        self.assertEqual(self.os_open.call_count, 3)
+
+    @TestBase.skipUnlessOnLinux()
+    def test_close_xbar_fds(self):
+        """
+        Test that _close_xbar_fds() closes all crossbar file descriptors, and
+        that they get reopened on the next access.
+        """
+        self.mgr.get_num_blocks(0)
+        self.mgr.set_xbar_local_addr(0, 0x2)
+        xbar_fds = self._get_xbar_fds()
+        self.assertEqual(len(xbar_fds), 3)
+        self.mgr._close_xbar_fds()
+        self.assertEqual(self._get_xbar_fds(), [])
+        for fd in xbar_fds:
+            self._assert_closed(fd)
+        self.mgr.set_xbar_local_addr(0, 0x3)
+        self.assertEqual(self._read_xbar_attr('local_addr'), '0x3')
+        self.assertEqual(len(self._get_xbar_fds()), 2)
+
+    @TestBase.skipUnlessOnLinux()
+    def test_tear_down(self):
+        """
+        Test that tear_down() closes the crossbar file descriptors, shuts
+        down the dboard init thread pool, and clears the cached udev lookups.
+        """
+        self.mgr.get_num_blocks(0)
+        xbar_fds = self._get_xbar_fds()
+        self.mgr.dboards.append(mock.Mock(**{'init.return_value': True}))
+        self.assertTrue(self.mgr.init({}))
+        dboard_executor = self.mgr._dboard_executor
+        self.assertIsNotNone(dboard_executor)
+        with mock.patch.object(
+                udev.get_eeprom_paths_cached, 'cache_clear') as eeprom_clear, \
+                mock.patch.object(
+                    udev.get_spidev_nodes_cached, 'cache_clear') as spi_clear:
+            self.mgr.tear_down()
+        for fd in xbar_fds:
+            self._assert_closed(fd)
+        self.assertEqual(self._get_xbar_fds(), [])
+        self.assertIsNone(self.mgr._dboard_executor)
+        with self.assertRaises(RuntimeError):
+            dboard_executor.submit(lambda: None)
+        eeprom_clear.assert_called_once_with()
+        spi_clear.assert_called_once_with()
@@ -10,9 +10,10 @@ USRP MPM Python Unit testing framework
 import unittest
 import sys
 from sys_utils_tests import TestNet
+from periph_manager_tests import TestPeriphManagerBase
 
 TESTS = {
-    '__all__': {TestNet},
+    '__all__': {TestNet, TestPeriphManagerBase},
     'n3xx': set(),
 }
 
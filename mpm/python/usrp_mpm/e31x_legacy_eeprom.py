@@ -11,6 +11,7 @@ import struct
 import zlib
 from builtins import zip
 from builtins import object
+from usrp_mpm.eeprom import read_eeprom_data
 
 
 class MboardEEPROM(object):
@@ -76,9 +77,7 @@ def read_eeprom(
     max_size -- Max number of bytes to be read. If omitted, will read the full file.
     """
 
-    max_size = max_size or -1
-    with open(nvmem_path, "rb") as nvmem_file:
-        data = nvmem_file.read(max_size)[offset:]
+    data = read_eeprom_data(nvmem_path, offset, max_size)
     eeprom_parser = struct.Struct(eeprom_header_format)
     eeprom_keys = eeprom_header_keys
     parsed_data = eeprom_parser.unpack_from(data)
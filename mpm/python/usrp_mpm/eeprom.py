@@ -7,13 +7,23 @@
 EEPROM management code
 """
 
+import os
 import struct
 import zlib
+from functools import lru_cache
 from builtins import zip
 from builtins import object
 
 EEPROM_DEFAULT_HEADER = struct.Struct("!I I")
 
+@lru_cache(maxsize=None)
+def _get_header_struct(header_format):
+    """
+    Return a compiled struct.Struct for the given header format string. There's
+    only a handful of EEPROM formats, so we keep them all around.
+    """
+    return struct.Struct(header_format)
+
 class MboardEEPROM(object):
     """
     Given a nvmem path, read out EEPROM values from the motherboard's EEPROM.
@@ -128,24 +138,47 @@ class DboardEEPROM(object):
     )
 
 
-def read_eeprom(
-        nvmem_path,
-        offset,
+def read_eeprom_data(nvmem_path, offset, max_size=None):
+    """
+    Read the raw contents of the EEPROM located at nvmem_path, starting at
+    offset. This only does the I/O, see parse_eeprom() for making sense of the
+    data.
+
+    nvmem_path -- Path to readable file (typically something in sysfs)
+    offset -- Offset of the EEPROM data within the file
+    max_size -- Max number of bytes to be read. If omitted, will read the full file.
+    """
+    with open(nvmem_path, "rb", buffering=0) as nvmem_file:
+        if max_size:
+            # Only fetch the bytes we care about. Usually, that's a single
+            # syscall, but sysfs returns at most a page per read, so keep
+            # going until we have all of them or hit the end of the file.
+            size = max(max_size - offset, 0)
+            data = b''
+            while len(data) < size:
+                chunk = os.pread(nvmem_file.fileno(), size - len(data),
+                                 offset + len(data))
+                if not chunk:
+                    break
+                data += chunk
+            return data
+        return nvmem_file.read()[offset:]
+
+
+def parse_eeprom(
+        data,
         eeprom_header_format,
         eeprom_header_keys,
         expected_magic,
-        max_size=None
 ):
     """
-    Read the EEPROM located at nvmem_path and return a tuple (header, data)
-    Header is already parsed in the common header fields
-    Data contains the full eeprom data structure
+    Parse raw EEPROM data (as returned by read_eeprom_data()) and return the
+    header as a dictionary. Header is parsed in the common header fields.
 
-    nvmem_path -- Path to readable file (typically something in sysfs)
+    data -- Raw EEPROM data
     eeprom_header_format -- List of header formats, by version
     eeprom_header_keys -- List of keys for the entries in the EEPROM
     expected_magic -- The magic value that is expected
-    max_size -- Max number of bytes to be read. If omitted, will read the full file.
     """
     assert len(eeprom_header_format) == len(eeprom_header_keys)
     def _parse_eeprom_data(
@@ -157,7 +190,7 @@ def read_eeprom(
         This also parses the CRC and assumes CRC is the last 4 bytes of each data.
         Returns a dictionary.
         """
-        eeprom_parser = struct.Struct(eeprom_header_format[version])
+        eeprom_parser = _get_header_struct(eeprom_header_format[version])
         eeprom_keys = eeprom_header_keys[version]
         parsed_data = eeprom_parser.unpack_from(data)
         read_crc = parsed_data[-1]
@@ -169,10 +202,6 @@ def read_eeprom(
                 "Read: {:08X} Expected: {:08X}".format(
                     read_crc, expected_crc))
         return dict(list(zip(eeprom_keys, parsed_data)))
-    # Dawaj, dawaj
-    max_size = max_size or -1
-    with open(nvmem_path, "rb") as nvmem_file:
-        data = nvmem_file.read(max_size)[offset:]
     eeprom_magic, eeprom_version = EEPROM_DEFAULT_HEADER.unpack_from(data)
     if eeprom_magic != expected_magic:
         raise RuntimeError(
@@ -181,6 +210,32 @@ def read_eeprom(
                 eeprom_magic, expected_magic))
     if eeprom_version >= len(eeprom_header_format):
         raise RuntimeError("Unexpected EEPROM version: `{}'".format(eeprom_version))
-    return (_parse_eeprom_data(data, eeprom_version), data)
+    return _parse_eeprom_data(data, eeprom_version)
 
 
+def read_eeprom(
+        nvmem_path,
+        offset,
+        eeprom_header_format,
+        eeprom_header_keys,
+        expected_magic,
+        max_size=None
+):
+    """
+    Read the EEPROM located at nvmem_path and return a tuple (header, data)
+    Header is already parsed in the common header fields
+    Data contains the full eeprom data structure
+
+    nvmem_path -- Path to readable file (typically something in sysfs)
+    eeprom_header_format -- List of header formats, by version
+    eeprom_header_keys -- List of keys for the entries in the EEPROM
+    expected_magic -- The magic value that is expected
+    max_size -- Max number of bytes to be read. If omitted, will read the full file.
+    """
+    # Dawaj, dawaj
+    data = read_eeprom_data(nvmem_path, offset, max_size)
+    return (
+        parse_eeprom(
+            data, eeprom_header_format, eeprom_header_keys, expected_magic),
+        data,
+    )
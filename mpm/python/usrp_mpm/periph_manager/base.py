@@ -7,37 +7,60 @@
 Mboard implementation base class
 """
 
-from __future__ import print_function
 import os
-from hashlib import md5
+import logging
+import hashlib
+import tempfile
 from time import sleep
 from concurrent import futures
-from builtins import str
-from builtins import object
-from six import iteritems, itervalues
-from usrp_mpm.mpmlog import get_logger
-from usrp_mpm.sys_utils.udev import get_eeprom_paths
-from usrp_mpm.sys_utils.udev import get_spidev_nodes
+from usrp_mpm.mpmlog import get_logger, TRACE
+from usrp_mpm.sys_utils.udev import get_eeprom_paths_cached
+from usrp_mpm.sys_utils.udev import get_spidev_nodes_cached
+from usrp_mpm.sys_utils.udev import clear_cached_lookups
 from usrp_mpm.sys_utils import dtoverlay
 from usrp_mpm.sys_utils import net
 from usrp_mpm import eeprom
 from usrp_mpm.rpc_server import no_claim, no_rpc
 from usrp_mpm import prefs
 
-def get_dboard_class_from_pid(pid):
+# Component files (e.g., FPGA images) can be several MiB in size. We process
+# them in chunks of this many bytes.
+COMPONENT_CHUNK_SIZE = 1 << 20
+# Component files get written here before they're handed to the update callback
+UPLOADS_DIR = os.path.join(os.sep, "tmp", "uploads")
+# Hash algorithms that can be used to verify component files, in order of
+# preference. The metadata key is the name of the algorithm.
+COMPONENT_HASH_ALGOS = ('sha256', 'md5')
+
+# Map PID -> dboard class. Gets populated on first use by
+# get_dboard_class_from_pid().
+_DBOARD_CLASS_FROM_PID = None
+
+def _build_dboard_class_map():
     """
-    Given a PID, return a dboard class initializer callable.
+    Scan the dboard_manager module for dboard classes and return a dictionary
+    mapping every PID to the first class that claims it.
     """
     from usrp_mpm import dboard_manager
-    for member in itervalues(dboard_manager.__dict__):
+    pid_map = {}
+    for member in dboard_manager.__dict__.values():
         try:
             if issubclass(member, dboard_manager.DboardManagerBase) and \
-                    hasattr(member, 'pids') and \
-                    pid in member.pids:
-                return member
+                    hasattr(member, 'pids'):
+                for pid in member.pids:
+                    pid_map.setdefault(pid, member)
         except (TypeError, AttributeError):
             continue
-    return None
+    return pid_map
+
+def get_dboard_class_from_pid(pid):
+    """
+    Given a PID, return a dboard class initializer callable.
+    """
+    global _DBOARD_CLASS_FROM_PID
+    if _DBOARD_CLASS_FROM_PID is None:
+        _DBOARD_CLASS_FROM_PID = _build_dboard_class_map()
+    return _DBOARD_CLASS_FROM_PID.get(pid)
 
 
 class PeriphManagerBase(object):
@@ -87,7 +110,8 @@ class PeriphManagerBase(object):
     # check.
     mboard_max_rev = None
     # A list of available sensors on the motherboard. This dictionary is a map
-    # of the form sensor_name -> method name
+    # of the form sensor_name -> method name. To add sensors at runtime, use
+    # _register_mb_sensor().
     mboard_sensor_callback_map = {}
     # This is a sanity check value to see if the correct number of
     # daughterboards are detected. If somewhere along the line more than
@@ -179,18 +203,56 @@ class PeriphManagerBase(object):
         # Note: args is a dictionary.
         assert len(self.pids) > 0
         assert self.mboard_eeprom_magic is not None
+        self._pid_set = frozenset(self.pids)
         self.dboards = []
         self._default_args = ""
+        # Name of the prefs section for this device. See _update_default_args().
+        self._prefs_section_name = None
+        self._prefs_section_resolved = False
+        # Thread pool for initializing dboards in parallel. Gets created on
+        # the first call to init(), and then kept around for later sessions.
+        self._dboard_executor = None
+        # Cache for the part of get_device_info() that doesn't change
+        self._static_device_info = None
+        # Open file descriptors of crossbar sysfs attributes, keyed by
+        # (xbar_index, attribute name). See _get_xbar_fd().
+        self._xbar_fds = {}
+        # Open directory file descriptors of the crossbar sysfs nodes, keyed by
+        # xbar_index
+        self._xbar_dir_fds = {}
+        # Cached get_num_blocks() results, keyed by xbar_index. The number of
+        # crossbar ports is fixed by the FPGA image, so this only gets cleared
+        # at init() and deinit() (i.e., whenever the FPGA may have been
+        # reloaded).
+        self._num_blocks_cache = {}
+        # Map sensor name -> bound sensor callback. Entries get added the
+        # first time a sensor is read, see _get_mb_sensor_callback().
+        self._mb_sensor_callbacks = {}
+        # Tuple of sensor names, see get_mb_sensors()
+        self._mb_sensor_names = None
+        # Cached get_component_info() return values, keyed by component name
+        self._component_info_cache = {}
+        # Stringified version of the mboard EEPROM header, see get_mb_eeprom()
+        self._eeprom_head_str = None
         # Set up logging
         self.log = get_logger('PeriphManager')
         self.claimed = False
+        # A new periph manager may run with a different set of overlays than
+        # the previous one (e.g., after an FPGA update), which may not have
+        # been torn down, so start off with empty udev caches.
+        clear_cached_lookups()
         try:
-            self._eeprom_head, self._eeprom_rawdata = \
-                self._read_mboard_eeprom()
-            self.mboard_info = self._get_mboard_info(self._eeprom_head)
-            self.log.info("Device serial number: {}"
-                          .format(self.mboard_info.get('serial', 'n/a')))
-            self.dboard_infos = self._get_dboard_eeprom_info()
+            # The mboard and dboard EEPROMs are independent, so we read out the
+            # dboard EEPROMs in the background while handling the mboard.
+            with futures.ThreadPoolExecutor(max_workers=1) as executor:
+                dboard_infos_future = \
+                    executor.submit(self._get_dboard_eeprom_info)
+                self._eeprom_head, self._eeprom_rawdata = \
+                    self._read_mboard_eeprom()
+                self.mboard_info = self._get_mboard_info(self._eeprom_head)
+                self.log.info("Device serial number: %s",
+                              self.mboard_info.get('serial', 'n/a'))
+                self.dboard_infos = dboard_infos_future.result()
             self.device_info = \
                     self.generate_device_info(
                         self._eeprom_head,
@@ -216,14 +278,14 @@ class PeriphManagerBase(object):
         initialized.
         """
         self._default_args = self._update_default_args(args)
-        self.log.debug("Using default args: {}".format(self._default_args))
+        self.log.debug("Using default args: %s", self._default_args)
         override_db_pids_str = self._default_args.get('override_db_pids')
         if override_db_pids_str:
-            override_db_pids = [
+            override_db_pids = tuple(
                 int(x, 0) for x in override_db_pids_str.split(",")
-            ]
+            )
         else:
-            override_db_pids = []
+            override_db_pids = ()
         self._init_dboards(
             self.dboard_infos,
             override_db_pids,
@@ -242,20 +304,19 @@ class PeriphManagerBase(object):
         If no EEPROM is defined, returns empty values.
         """
         if len(self.mboard_eeprom_addr):
-            self.log.trace("Reading EEPROM from address `{}'..."
-                           .format(self.mboard_eeprom_addr))
+            self.log.trace("Reading EEPROM from address `%s'...",
+                           self.mboard_eeprom_addr)
             (eeprom_head, eeprom_rawdata) = eeprom.read_eeprom(
-                get_eeprom_paths(self.mboard_eeprom_addr)[0],
+                get_eeprom_paths_cached(self.mboard_eeprom_addr)[0],
                 self.mboard_eeprom_offset,
                 eeprom.MboardEEPROM.eeprom_header_format,
                 eeprom.MboardEEPROM.eeprom_header_keys,
                 self.mboard_eeprom_magic,
                 self.mboard_eeprom_max_len,
             )
-            self.log.trace("Found EEPROM metadata: `{}'"
-                           .format(str(eeprom_head)))
-            self.log.trace("Read {} bytes of EEPROM data."
-                           .format(len(eeprom_rawdata)))
+            self.log.trace("Found EEPROM metadata: `%s'", eeprom_head)
+            self.log.trace("Read %d bytes of EEPROM data.",
+                           len(eeprom_rawdata))
             return eeprom_head, eeprom_rawdata
         # Nothing defined? Return defaults.
         self.log.trace("No mboard EEPROM path defined. "
@@ -278,13 +339,13 @@ class PeriphManagerBase(object):
             except TypeError:
                 mboard_info[key] = str(eeprom_head.get(key, ''))
         if 'pid' in eeprom_head:
-            if eeprom_head['pid'] not in self.pids.keys():
+            if eeprom_head['pid'] not in self._pid_set:
                 self.log.error(
                     "Found invalid PID in EEPROM: 0x{:04X}. " \
                     "Valid PIDs are: {}".format(
                         eeprom_head['pid'],
-                        ", ".join(["0x{:04X}".format(x)
-                                   for x in self.pids.keys()]),
+                        ", ".join("0x{:04X}".format(x)
+                                  for x in sorted(self._pid_set)),
                     )
                 )
                 raise RuntimeError("Invalid PID found in EEPROM.")
@@ -327,44 +388,64 @@ class PeriphManagerBase(object):
                               if isinstance(self.dboard_eeprom_addr, list) \
                               else [self.dboard_eeprom_addr]
         dboard_eeprom_paths = []
-        self.log.trace("Identifying dboard EEPROM paths from addrs `{}'..."
-                       .format(",".join(dboard_eeprom_addrs)))
+        if self.log.isEnabledFor(TRACE):
+            self.log.trace("Identifying dboard EEPROM paths from addrs `%s'...",
+                           ",".join(dboard_eeprom_addrs))
         for dboard_eeprom_addr in dboard_eeprom_addrs:
             self.log.trace("Resolving %s...", dboard_eeprom_addr)
-            dboard_eeprom_paths += get_eeprom_paths(dboard_eeprom_addr)
-        self.log.trace("Found dboard EEPROM paths: {}"
-                       .format(",".join(dboard_eeprom_paths)))
+            dboard_eeprom_paths += get_eeprom_paths_cached(dboard_eeprom_addr)
+        if self.log.isEnabledFor(TRACE):
+            self.log.trace("Found dboard EEPROM paths: %s",
+                           ",".join(dboard_eeprom_paths))
         if len(dboard_eeprom_paths) > self.max_num_dboards:
             self.log.warning("Found more EEPROM paths than daughterboards. "
                              "Ignoring some of them.")
             dboard_eeprom_paths = dboard_eeprom_paths[:self.max_num_dboards]
-        dboard_info = []
-        for dboard_idx, dboard_eeprom_path in enumerate(dboard_eeprom_paths):
-            self.log.debug("Reading EEPROM info for dboard %d...", dboard_idx)
-            dboard_eeprom_md, dboard_eeprom_rawdata = eeprom.read_eeprom(
-                dboard_eeprom_path,
-                self.dboard_eeprom_offset,
-                eeprom.DboardEEPROM.eeprom_header_format,
-                eeprom.DboardEEPROM.eeprom_header_keys,
-                self.dboard_eeprom_magic,
-                self.dboard_eeprom_max_len,
-            )
-            self.log.trace("Found dboard EEPROM metadata: `{}'"
-                           .format(str(dboard_eeprom_md)))
-            self.log.trace("Read %d bytes of dboard EEPROM data.",
-                           len(dboard_eeprom_rawdata))
-            db_pid = dboard_eeprom_md.get('pid')
-            if db_pid is None:
-                self.log.warning("No dboard PID found in dboard EEPROM!")
-            else:
-                self.log.debug("Found dboard PID in EEPROM: 0x{:04X}"
-                               .format(db_pid))
-            dboard_info.append({
-                'eeprom_md': dboard_eeprom_md,
-                'eeprom_rawdata': dboard_eeprom_rawdata,
-                'pid': db_pid,
-            })
-        return dboard_info
+        if not dboard_eeprom_paths:
+            return []
+        # EEPROM reads block on the I2C bus, so read all of them concurrently,
+        # and only then parse the results
+        with futures.ThreadPoolExecutor(
+                max_workers=len(dboard_eeprom_paths)) as executor:
+            dboard_eeprom_data = list(executor.map(
+                lambda path: eeprom.read_eeprom_data(
+                    path,
+                    self.dboard_eeprom_offset,
+                    self.dboard_eeprom_max_len,
+                ),
+                dboard_eeprom_paths,
+            ))
+        return [
+            self._parse_dboard_eeprom(dboard_idx, dboard_eeprom_rawdata)
+            for dboard_idx, dboard_eeprom_rawdata
+            in enumerate(dboard_eeprom_data)
+        ]
+
+    def _parse_dboard_eeprom(self, dboard_idx, dboard_eeprom_rawdata):
+        """
+        Parse the raw data of a single dboard EEPROM and return its dboard info
+        dictionary.
+        """
+        self.log.debug("Parsing EEPROM info for dboard %d...", dboard_idx)
+        dboard_eeprom_md = eeprom.parse_eeprom(
+            dboard_eeprom_rawdata,
+            eeprom.DboardEEPROM.eeprom_header_format,
+            eeprom.DboardEEPROM.eeprom_header_keys,
+            self.dboard_eeprom_magic,
+        )
+        self.log.trace("Found dboard EEPROM metadata: `%s'", dboard_eeprom_md)
+        self.log.trace("Read %d bytes of dboard EEPROM data.",
+                       len(dboard_eeprom_rawdata))
+        db_pid = dboard_eeprom_md.get('pid')
+        if db_pid is None:
+            self.log.warning("No dboard PID found in dboard EEPROM!")
+        else:
+            self.log.debug("Found dboard PID in EEPROM: 0x%04X", db_pid)
+        return {
+            'eeprom_md': dboard_eeprom_md,
+            'eeprom_rawdata': dboard_eeprom_rawdata,
+            'pid': db_pid,
+        }
 
     def _update_default_args(self, default_args):
         """
@@ -373,11 +454,16 @@ class PeriphManagerBase(object):
         command line arguments.
         """
         prefs_cache = prefs.get_prefs()
-        periph_section_name = None
-        if prefs_cache.has_section(self.device_info.get('product')):
-            periph_section_name = self.device_info.get('product')
-        elif prefs_cache.has_section(self.device_info.get('type')):
-            periph_section_name = self.device_info.get('type')
+        # The device info doesn't change after initialization, and nobody adds
+        # sections to the prefs, so we only need to figure out the section
+        # name once.
+        if not self._prefs_section_resolved:
+            if prefs_cache.has_section(self.device_info.get('product')):
+                self._prefs_section_name = self.device_info.get('product')
+            elif prefs_cache.has_section(self.device_info.get('type')):
+                self._prefs_section_name = self.device_info.get('type')
+            self._prefs_section_resolved = True
+        periph_section_name = self._prefs_section_name
         if periph_section_name is not None:
             prefs_cache.read_dict({periph_section_name: default_args})
             return dict(prefs_cache[periph_section_name])
@@ -391,14 +477,20 @@ class PeriphManagerBase(object):
         requested_overlays = self.list_required_dt_overlays(
             self.device_info,
         )
-        self.log.debug("Motherboard requests device tree overlays: {}".format(
-            requested_overlays
-        ))
-        for overlay in requested_overlays:
+        self.log.debug("Motherboard requests device tree overlays: %s",
+                       requested_overlays)
+        # Note: The overlays need to be applied in order, so we can't apply
+        # them in parallel.
+        overlays_applied = [
             dtoverlay.apply_overlay_safe(overlay)
+            for overlay in requested_overlays
+        ]
         # Need to wait here a second to make sure the ethernet interfaces are up
+        # If no overlay was actually applied, nothing changed, and there's
+        # nothing to wait for.
         # TODO: Fine-tune this number, or wait for some smarter signal.
-        sleep(1)
+        if any(overlays_applied):
+            sleep(1)
 
     def _init_dboards(self, dboard_infos, override_dboard_pids, default_args):
         """
@@ -411,7 +503,8 @@ class PeriphManagerBase(object):
         """
         if override_dboard_pids:
             self.log.warning("Overriding daughterboard PIDs with: {}"
-                             .format(",".join(override_dboard_pids)))
+                             .format(",".join("0x{:04X}".format(x)
+                                              for x in override_dboard_pids)))
         assert len(dboard_infos) <= self.max_num_dboards
         if len(override_dboard_pids) and \
                 len(override_dboard_pids) < len(dboard_infos):
@@ -426,18 +519,20 @@ class PeriphManagerBase(object):
                                  "for PID {:04X}! Skipping.".format(db_pid))
                 continue
             if len(self.dboard_spimaster_addrs) > dboard_idx:
-                spi_nodes = sorted(get_spidev_nodes(
+                spi_nodes = sorted(get_spidev_nodes_cached(
                     self.dboard_spimaster_addrs[dboard_idx]))
-                self.log.trace("Found spidev nodes: {0}".format(spi_nodes))
+                self.log.trace("Found spidev nodes: %s", spi_nodes)
             else:
                 spi_nodes = []
                 self.log.warning("No SPI nodes for dboard %d.", dboard_idx)
-            dboard_info.update({
-                'spi_nodes': spi_nodes,
-                'default_args': default_args,
-            })
+            # Don't modify dboard_info, it's the info we read from the EEPROM
+            dboard_kwargs = dict(
+                dboard_info,
+                spi_nodes=spi_nodes,
+                default_args=default_args,
+            )
             # This will actually instantiate the dboard class:
-            self.dboards.append(db_class(dboard_idx, **dboard_info))
+            self.dboards.append(db_class(dboard_idx, **dboard_kwargs))
         self.log.info("Initialized %d daughterboard(s).", len(self.dboards))
 
     ###########################################################################
@@ -461,9 +556,11 @@ class PeriphManagerBase(object):
         args -- A dictionary of args for initialization. Similar to device args
                 in UHD.
         """
-        self.log.info("init() called with device args `{}'.".format(
-            ",".join(['{}={}'.format(x, args[x]) for x in args])
-        ))
+        self._num_blocks_cache = {}
+        if self.log.isEnabledFor(logging.INFO):
+            self.log.info(
+                "init() called with device args `%s'.",
+                ",".join('{}={}'.format(k, v) for k, v in args.items()))
         if not self._device_initialized:
             self.log.error(
                 "Cannot run init(), device was never fully initialized!")
@@ -474,16 +571,24 @@ class PeriphManagerBase(object):
             self.log.debug("Initializing dboards serially...")
             return all((dboard.init(args) for dboard in self.dboards))
         self.log.debug("Initializing dboards in parallel...")
-        num_workers = len(self.dboards)
-        with futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
-            init_futures = [
-                executor.submit(dboard.init, args)
-                for dboard in self.dboards
-            ]
-            return all([
+        if self._dboard_executor is None:
+            self._dboard_executor = \
+                futures.ThreadPoolExecutor(max_workers=len(self.dboards))
+        init_futures = [
+            self._dboard_executor.submit(dboard.init, args)
+            for dboard in self.dboards
+        ]
+        try:
+            # Evaluate results as they come in, and bail out on the first
+            # failure.
+            return all(
                 x.result()
                 for x in futures.as_completed(init_futures)
-            ])
+            )
+        finally:
+            # Don't return while dboard inits are still running, deinit() must
+            # not race with them.
+            futures.wait(init_futures)
 
     def deinit(self):
         """
@@ -498,6 +603,8 @@ class PeriphManagerBase(object):
         self.log.trace("Mboard deinit() called.")
         for dboard in self.dboards:
             dboard.deinit()
+        self._close_xbar_fds()
+        self._num_blocks_cache = {}
 
     def tear_down(self):
         """
@@ -505,6 +612,11 @@ class PeriphManagerBase(object):
         deconstruction.
         """
         self.log.trace("Teardown called for Peripheral Manager base.")
+        self._close_xbar_fds()
+        if self._dboard_executor is not None:
+            self._dboard_executor.shutdown(wait=True)
+            self._dboard_executor = None
+        clear_cached_lookups()
 
     ###########################################################################
     # Misc device status controls and indicators
@@ -548,12 +660,15 @@ class PeriphManagerBase(object):
         Will also call into get_device_info_dyn() for additional information.
         Don't override this function.
         """
+        if self._static_device_info is None:
+            self._static_device_info = dict(
+                self.device_info,
+                description=self.description,
+            )
         result = {"claimed": str(self.claimed)}
-        result.update(self.device_info)
-        result.update({
-            'name': net.get_hostname(),
-            'description': self.description,
-        })
+        result.update(self._static_device_info)
+        # The hostname isn't cached, it can be changed at runtime
+        result['name'] = net.get_hostname()
         result.update(self.get_device_info_dyn())
         return result
 
@@ -577,6 +692,7 @@ class PeriphManagerBase(object):
         is reset.
         """
         assert conn_type in ('remote', 'local', None)
+        self._static_device_info = None
         if conn_type is None:
             self.device_info.pop('rpc_connection', None)
         else:
@@ -605,55 +721,139 @@ class PeriphManagerBase(object):
         Updates the device component specified by comp_dict
         :param metadata_l: List of dictionary of strings containing metadata
         :param data_l: List of binary string with the file contents to be written
+
+        If a component's metadata contains a 'sha256' or 'md5' key (as a hex
+        string), the component file is verified against it before it gets
+        updated. If both are given, 'sha256' is used.
         """
         # We need a 'metadata' and a 'data' for each file we want to update
         assert (len(metadata_l) == len(data_l)),\
             "update_component arguments must be the same length"
         # TODO: Update the manifest file
 
-        # Iterate through the components, updating each in turn
-        for metadata, data in zip(metadata_l, data_l):
+        # Check all the components before anything gets written to disk
+        for metadata in metadata_l:
             id_str = metadata['id']
-            filename = os.path.basename(metadata['filename'])
             if id_str not in self.updateable_components:
                 self.log.error("{0} not an updateable component ({1})".format(
                     id_str, self.updateable_components.keys()
                 ))
-                raise KeyError("Update component not implemented for {}".format(id_str))
-            self.log.trace("Updating component: {}".format(id_str))
-            if 'md5' in metadata:
-                given_hash = metadata['md5']
-                comp_hash = md5()
-                comp_hash.update(data)
-                comp_hash = comp_hash.hexdigest()
-                if comp_hash == given_hash:
-                    self.log.trace("Component file hash matched: {}".format(
-                        comp_hash
+                raise KeyError("Update component not implemented for {}".format(
+                    id_str))
+        os.makedirs(UPLOADS_DIR, exist_ok=True)
+        # Every component gets written to its own temporary file first, and
+        # only gets moved to its final path once it's verified. Writing also
+        # computes the hash (if any), so every file is only traversed once, and
+        # multiple components get written in parallel.
+        tmp_paths = []
+        try:
+            with futures.ThreadPoolExecutor(
+                    max_workers=max(len(metadata_l), 1)) as executor:
+                components = []
+                for metadata, data in zip(metadata_l, data_l):
+                    hash_algo = next(
+                        (x for x in COMPONENT_HASH_ALGOS if x in metadata), None)
+                    tmp_fd, tmp_path = tempfile.mkstemp(
+                        suffix='.part', dir=UPLOADS_DIR)
+                    tmp_paths.append(tmp_path)
+                    # mkstemp() creates files that only the owner can read,
+                    # but the update callbacks may copy this one (including
+                    # its mode) to its destination
+                    os.fchmod(tmp_fd, 0o644)
+                    components.append((
+                        metadata,
+                        hash_algo,
+                        executor.submit(self._write_component_file,
+                                        tmp_fd, data, hash_algo),
                     ))
-                else:
-                    self.log.error("Component file hash mismatched:\n"
-                                   "Calculated {}\n"
-                                   "Given      {}\n".format(
-                                       comp_hash, given_hash))
-                    raise RuntimeError("Component file hash mismatch")
-            else:
-                self.log.trace("Loading unverified {} image.".format(
-                    id_str
-                ))
-            basepath = os.path.join(os.sep, "tmp", "uploads")
-            filepath = os.path.join(basepath, filename)
-            if not os.path.isdir(basepath):
-                self.log.trace("Creating directory {}".format(basepath))
-                os.makedirs(basepath)
-            self.log.trace("Writing data to {}".format(filepath))
-            with open(filepath, 'wb') as f:
-                f.write(data)
-            update_func = \
-                getattr(self, self.updateable_components[id_str]['callback'])
-            self.log.info("Updating component `%s'", id_str)
-            update_func(filepath, metadata)
+                # Iterate through the components, verifying and updating each
+                # in turn
+                for comp_idx, (metadata, hash_algo, write_future) \
+                        in enumerate(components):
+                    id_str = metadata['id']
+                    self.log.trace("Updating component: %s", id_str)
+                    comp_hash = write_future.result()
+                    if comp_hash is not None:
+                        given_hash = metadata[hash_algo]
+                        try:
+                            hash_matched = \
+                                comp_hash == bytes.fromhex(given_hash)
+                        except ValueError:
+                            hash_matched = False
+                        if hash_matched:
+                            self.log.trace("Component file %s hash matched: %s",
+                                           hash_algo, given_hash)
+                        else:
+                            self.log.error("Component file {} hash mismatched:\n"
+                                           "Calculated {}\n"
+                                           "Given      {}\n".format(
+                                               hash_algo, comp_hash.hex(),
+                                               given_hash))
+                            raise RuntimeError("Component file hash mismatch")
+                    else:
+                        self.log.trace("Loading unverified %s image.", id_str)
+                    filepath = os.path.join(
+                        UPLOADS_DIR, os.path.basename(metadata['filename']))
+                    self.log.trace("Moving data to %s", filepath)
+                    os.rename(tmp_paths[comp_idx], filepath)
+                    tmp_paths[comp_idx] = None
+                    update_func = getattr(
+                        self, self.updateable_components[id_str]['callback'])
+                    self.log.info("Updating component `%s'", id_str)
+                    try:
+                        update_func(filepath, metadata)
+                    finally:
+                        # The update may have changed the component's metadata
+                        # (e.g., a new FPGA image may be of a different type),
+                        # so get_component_info() needs to rebuild it. This
+                        # also applies if the update failed halfway through.
+                        self._component_info_cache.pop(id_str, None)
+        finally:
+            # Don't leave behind the files of components that didn't get
+            # updated (e.g., because of a hash mismatch)
+            for tmp_path in tmp_paths:
+                if tmp_path is not None:
+                    try:
+                        os.remove(tmp_path)
+                    except OSError:
+                        pass
         return True
 
+    @staticmethod
+    def _write_component_file(comp_fd, data, hash_algo=None):
+        """
+        Write a component's data to the file descriptor comp_fd in chunks, and
+        close it. If hash_algo (one of COMPONENT_HASH_ALGOS) is given, every
+        chunk is also fed into a hash while it's hot.
+
+        Returns the digest of the data, or None if no hash_algo was given.
+        """
+        comp_hash = None if hash_algo is None else hashlib.new(hash_algo)
+        data_view = memoryview(data)
+        # The chunks are big enough that Python's buffered I/O only adds
+        # overhead, so we write them out directly.
+        try:
+            for chunk_offset in range(0, len(data_view), COMPONENT_CHUNK_SIZE):
+                chunk = \
+                    data_view[chunk_offset:chunk_offset + COMPONENT_CHUNK_SIZE]
+                if comp_hash is not None:
+                    comp_hash.update(chunk)
+                # os.write() may write less than requested
+                while chunk:
+                    chunk = chunk[os.write(comp_fd, chunk):]
+        finally:
+            os.close(comp_fd)
+        return None if comp_hash is None else comp_hash.digest()
+
+    def _set_component_metadata(self, component_name, key, value):
+        """
+        Set the metadata value key of the updateable component component_name.
+        Use this instead of modifying updateable_components directly, so that
+        get_component_info() picks up the change.
+        """
+        self.updateable_components[component_name][key] = value
+        self._component_info_cache.pop(component_name, None)
+
     @no_claim
     def get_component_info(self, component_name):
         """
@@ -662,14 +862,22 @@ class PeriphManagerBase(object):
         :return: Dictionary of strings containg metadata
         """
         if component_name in self.updateable_components:
-            metadata = self.updateable_components.get(component_name)
-            metadata['id'] = component_name
-            self.log.trace("Component info: {}".format(metadata))
-            # Convert all values to str
-            return dict([a, str(x)] for a, x in metadata.items())
+            if component_name not in self._component_info_cache:
+                # Convert all values to str. Don't modify the original
+                # metadata, it's shared between all instances. This only
+                # needs to be redone when _set_component_metadata() is called.
+                component_info = {
+                    key: str(value) for key, value
+                    in self.updateable_components[component_name].items()
+                }
+                component_info['id'] = component_name
+                self._component_info_cache[component_name] = component_info
+            component_info = self._component_info_cache[component_name]
+            self.log.trace("Component info: %s", component_info)
+            return dict(component_info)
         else:
-            self.log.trace("Component not found in updateable components: {}"
-                           .format(component_name))
+            self.log.trace("Component not found in updateable components: %s",
+                           component_name)
             return {}
 
     ###########################################################################
@@ -690,12 +898,14 @@ class PeriphManagerBase(object):
 
         xbar_index -- The index of the crossbar that's being queried.
         docstring for get_num_blocks"""
-        # FIXME udev lookup
-        xbar_sysfs_path = '/sys/class/rfnoc_crossbar/crossbar{}/nports'.format(
-            xbar_index
-        )
-        return int(open(xbar_sysfs_path).read().strip()) - \
+        if xbar_index not in self._num_blocks_cache:
+            nports_fd = self._get_xbar_fd(xbar_index, 'nports', os.O_RDONLY)
+            # int() parses ASCII bytes directly, and ignores the trailing
+            # newline, so there's no need to decode or strip.
+            self._num_blocks_cache[xbar_index] = \
+                int(os.pread(nports_fd, 64, 0)) - \
                 self.get_base_port(xbar_index)
+        return self._num_blocks_cache[xbar_index]
 
     @no_claim
     def get_base_port(self, xbar_index):
@@ -714,18 +924,46 @@ class PeriphManagerBase(object):
         """
         Program crossbar xbar_index to have the local address local_addr.
         """
-        # FIXME udev lookup
-        xbar_sysfs_path = '/sys/class/rfnoc_crossbar/crossbar{}/local_addr'.format(
-            xbar_index
-        )
-        laddr_value = "0x{:X}".format(local_addr)
-        self.log.trace("Setting local address for xbar {} to {}.".format(
-            xbar_sysfs_path, laddr_value
-        ))
-        with open(xbar_sysfs_path, "w") as xbar_file:
-            xbar_file.write(laddr_value)
+        self.log.trace("Setting local address for xbar %d to 0x%X.",
+                       xbar_index, local_addr)
+        laddr_fd = self._get_xbar_fd(xbar_index, 'local_addr', os.O_WRONLY)
+        os.pwrite(laddr_fd, b"0x%X" % local_addr, 0)
         return True
 
+    def _get_xbar_fd(self, xbar_index, attr, flags):
+        """
+        Return a file descriptor for the sysfs attribute attr of crossbar
+        xbar_index. The file descriptor stays open until _close_xbar_fds() is
+        called, so repeated accesses only cost a pread()/pwrite() (sysfs
+        attributes get regenerated on every access at offset 0).
+        """
+        key = (xbar_index, attr)
+        if key not in self._xbar_fds:
+            if xbar_index not in self._xbar_dir_fds:
+                # FIXME udev lookup
+                xbar_sysfs_path = \
+                    '/sys/class/rfnoc_crossbar/crossbar{}'.format(xbar_index)
+                # We only need this for opening the attributes relative to it,
+                # so the kernel only has to do the path lookup once.
+                self._xbar_dir_fds[xbar_index] = os.open(
+                    xbar_sysfs_path, os.O_PATH | os.O_DIRECTORY)
+            self._xbar_fds[key] = os.open(
+                attr, flags, dir_fd=self._xbar_dir_fds[xbar_index])
+        return self._xbar_fds[key]
+
+    def _close_xbar_fds(self):
+        """
+        Close all crossbar sysfs file descriptors. The crossbar devices can go
+        away when the FPGA gets reloaded, so we don't hold on to them across
+        sessions.
+        """
+        for xbar_fd in self._xbar_fds.values():
+            os.close(xbar_fd)
+        self._xbar_fds = {}
+        for xbar_dir_fd in self._xbar_dir_fds.values():
+            os.close(xbar_dir_fd)
+        self._xbar_dir_fds = {}
+
     ##########################################################################
     # Mboard Sensors
     ##########################################################################
@@ -733,7 +971,9 @@ class PeriphManagerBase(object):
         """
         Return a list of sensor names.
         """
-        return list(self.mboard_sensor_callback_map.keys())
+        if self._mb_sensor_names is None:
+            self._mb_sensor_names = tuple(self.mboard_sensor_callback_map)
+        return list(self._mb_sensor_names)
 
     def get_mb_sensor(self, sensor_name):
         """
@@ -754,15 +994,39 @@ class PeriphManagerBase(object):
         - unit: This depends on the type. It is generally only relevant for
                 pretty-printing the sensor value.
         """
-        if sensor_name not in self.get_mb_sensors():
+        try:
+            sensor_cb = self._mb_sensor_callbacks[sensor_name]
+        except KeyError:
+            sensor_cb = self._get_mb_sensor_callback(sensor_name)
+        return sensor_cb()
+
+    def _get_mb_sensor_callback(self, sensor_name):
+        """
+        Resolve the callback for sensor_name from mboard_sensor_callback_map.
+        Successful lookups are cached, so later queries don't have to resolve
+        the callback by name again. Sensors whose callback can't be resolved
+        only fail on their own.
+        """
+        callback_name = self.mboard_sensor_callback_map.get(sensor_name)
+        if callback_name is None:
             error_msg = "Was asked for non-existent sensor `{}'.".format(
                 sensor_name
             )
             self.log.error(error_msg)
             raise RuntimeError(error_msg)
-        return getattr(
-            self, self.mboard_sensor_callback_map.get(sensor_name)
-        )()
+        sensor_cb = getattr(self, callback_name)
+        self._mb_sensor_callbacks[sensor_name] = sensor_cb
+        return sensor_cb
+
+    def _register_mb_sensor(self, sensor_name, callback_name):
+        """
+        Add the sensor sensor_name to the list of motherboard sensors.
+        callback_name is the name of the method that gets called to read the
+        sensor value.
+        """
+        self.mboard_sensor_callback_map[sensor_name] = callback_name
+        self._mb_sensor_callbacks.pop(sensor_name, None)
+        self._mb_sensor_names = None
 
     ##########################################################################
     # EEPROMS
@@ -773,7 +1037,13 @@ class PeriphManagerBase(object):
 
         All key/value pairs are string -> string
         """
-        return {k: str(v) for k, v in iteritems(self._eeprom_head)}
+        # The EEPROM header doesn't change after initialization (the base
+        # class doesn't implement set_mb_eeprom()), so we only need to
+        # stringify it once.
+        if self._eeprom_head_str is None:
+            self._eeprom_head_str = \
+                {k: str(v) for k, v in self._eeprom_head.items()}
+        return dict(self._eeprom_head_str)
 
     def set_mb_eeprom(self, eeprom_vals):
         """
@@ -783,8 +1053,8 @@ class PeriphManagerBase(object):
         and is thus defined in the individual device classes.
         """
         self.log.warn("Called set_mb_eeprom(), but not implemented!")
-        self.log.debug("Skipping writing EEPROM keys: {}"
-                       .format(list(eeprom_vals.keys())))
+        self.log.debug("Skipping writing EEPROM keys: %s",
+                       list(eeprom_vals.keys()))
         raise NotImplementedError
 
     def get_db_eeprom(self, dboard_idx):
@@ -813,8 +1083,8 @@ class PeriphManagerBase(object):
         """
         self.log.warn("Attempted to write dboard `%d' EEPROM, but function " \
                       "is not implemented.", dboard_idx)
-        self.log.debug("Skipping writing EEPROM keys: {}"
-                       .format(list(eeprom_data.keys())))
+        self.log.debug("Skipping writing EEPROM keys: %s",
+                       list(eeprom_data.keys()))
         raise NotImplementedError
 
     #######################################################################
@@ -8,11 +8,8 @@ E310 implementation module
 """
 
 from __future__ import print_function
-import bisect
-import copy
-import re
-import threading
-from six import iteritems, itervalues
+import os
+import time
 from usrp_mpm.components import ZynqComponents
 from usrp_mpm.dboard_manager import E31x_db
 from usrp_mpm.mpmtypes import SID
@@ -20,18 +17,22 @@ from usrp_mpm.mpmutils import assert_compat_number, str2bool
 from usrp_mpm.periph_manager import PeriphManagerBase
 from usrp_mpm.rpc_server import no_rpc
 from usrp_mpm.sys_utils import dtoverlay
-from usrp_mpm.sys_utils.sysfs_thermal import read_sysfs_sensors_value
-from usrp_mpm.sys_utils.udev import get_spidev_nodes
+from usrp_mpm.sys_utils.udev import get_eeprom_paths_cached
+from usrp_mpm.sys_utils.udev import get_spidev_nodes_cached
+from usrp_mpm.sys_utils.sysfs_thermal import get_sysfs_sensor_paths
 from usrp_mpm.xports import XportMgrLiberio
 from usrp_mpm.periph_manager.e31x_periphs import MboardRegsControl
-from usrp_mpm.sys_utils.udev import get_eeprom_paths
 from usrp_mpm import e31x_legacy_eeprom
 
 E310_DEFAULT_CLOCK_SOURCE = 'internal'
 E310_DEFAULT_TIME_SOURCE = 'internal'
+E310_CLOCK_SOURCES = ('internal',)
+E310_TIME_SOURCES = ('internal', 'external', 'gpsdo')
 E310_DEFAULT_ENABLE_FPGPIO = True
 E310_FPGA_COMPAT = (1,0)
 E310_DBOARD_SLOT_IDX = 0
+# Temperature readings younger than this (in seconds) are reused
+E310_TEMP_SENSOR_MAX_AGE = 0.5
 
 ###############################################################################
 # Transport managers
@@ -148,6 +149,19 @@ class e31x(ZynqComponents, PeriphManagerBase):
         Does partial initialization which loads low power idle image
         """
         super(e31x, self).__init__()
+        # Logger for the transport manager, which is recreated on every claim
+        self._liberio_log = self.log.getChild('liberio')
+        # Resolved sysfs paths of the temperature sensors, see
+        # _get_sensor_path()
+        self._sensor_paths = {}
+        # Open file descriptors of the sensor probes, see _read_sensor_probes()
+        self._sensor_probe_fds = {}
+        # sensor name -> (timestamp, temperature), see _get_temp_sensor()
+        self._temp_sensor_cache = {}
+        # The overlays only depend on device_info, which doesn't change. See
+        # list_owned_overlays().
+        self._idle_overlay = self.get_idle_dt_overlay(self.device_info)
+        self._owned_overlays = None
         # Start clean by removing MPM-owned overlays.
         active_overlays = self.list_active_overlays()
         mpm_overlays = self.list_owned_overlays()
@@ -201,18 +215,18 @@ class e31x(ZynqComponents, PeriphManagerBase):
         # - skip dboard EEPROM setup (we don't have one)
         # - change the way we handle SPI devices
         if override_dboard_pids:
-            self.log.warning("Overriding daughterboard PIDs with: {}"
-                             .format(override_dboard_pids))
+            self.log.warning("Overriding daughterboard PIDs with: %s",
+                             override_dboard_pids)
             raise NotImplementedError("Can't override dboard pids")
         # We have only one dboard
         dboard_info = dboard_infos[0]
         # Set up the SPI nodes
         spi_nodes = []
         for spi_addr in self.dboard_spimaster_addrs:
-            for spi_node in get_spidev_nodes(spi_addr):
-                bisect.insort(spi_nodes, spi_node)
+            spi_nodes.extend(get_spidev_nodes_cached(spi_addr))
+        spi_nodes.sort()
 
-        self.log.trace("Found spidev nodes: {0}".format(spi_nodes))
+        self.log.trace("Found spidev nodes: %s", spi_nodes)
 
         if not spi_nodes:
             self.log.warning("No SPI nodes for dboard %d.", E310_DBOARD_SLOT_IDX)
@@ -228,12 +242,11 @@ class e31x(ZynqComponents, PeriphManagerBase):
     def _check_fpga_compat(self):
         " Throw an exception if the compat numbers don't match up "
         actual_compat = self.mboard_regs_control.get_compat_number()
-        self.log.debug("Actual FPGA compat number: {:d}.{:d}".format(
-            actual_compat[0], actual_compat[1]
-        ))
+        self.log.debug("Actual FPGA compat number: %d.%d",
+                       actual_compat[0], actual_compat[1])
         assert_compat_number(
             E310_FPGA_COMPAT,
-            self.mboard_regs_control.get_compat_number(),
+            actual_compat,
             component="FPGA",
             fail_on_old_minor=True,
             log=self.log
@@ -273,21 +286,27 @@ class e31x(ZynqComponents, PeriphManagerBase):
         # Init Mboard Regs
         self.mboard_regs_control = MboardRegsControl(
             self.mboard_regs_label, self.log)
-        self.mboard_regs_control.get_git_hash()
-        self.mboard_regs_control.get_build_timestamp()
-        self._check_fpga_compat()
-        self._update_fpga_type()
-        self.crossbar_base_port = self.mboard_regs_control.get_xbar_baseport()
-        self.log.debug("crossbar base port: {}".format(self.crossbar_base_port))
+        # Keep the UIO open for all the identification registers, instead of
+        # mapping and unmapping it for every single register read
+        with self.mboard_regs_control.regs:
+            self.mboard_regs_control.get_git_hash()
+            self.mboard_regs_control.get_build_timestamp()
+            self._check_fpga_compat()
+            self._update_fpga_type()
+            self.crossbar_base_port = \
+                self.mboard_regs_control.get_xbar_baseport()
+        self.log.debug("crossbar base port: %s", self.crossbar_base_port)
 
         # Init clocking
         self._init_ref_clock_and_time(args)
         # Init CHDR transports
         self._xport_mgrs = {
-            'liberio': E310XportMgrLiberio(self.log.getChild('liberio')),
+            'liberio': E310XportMgrLiberio(self._liberio_log),
         }
+        # The set of transport managers is fixed from here on
+        self._xport_mgr_list = tuple(self._xport_mgrs.values())
         # Init complete.
-        self.log.debug("mboard info: {}".format(self.mboard_info))
+        self.log.debug("mboard info: %s", self.mboard_info)
 
     def _read_mboard_eeprom(self):
         """
@@ -301,16 +320,15 @@ class e31x(ZynqComponents, PeriphManagerBase):
         if len(self.mboard_eeprom_addr):
             (eeprom_head, eeprom_rawdata) = e31x_legacy_eeprom.read_eeprom(
                 True, # isMotherboard
-                get_eeprom_paths(self.mboard_eeprom_addr)[self.mboard_eeprom_path_index],
+                get_eeprom_paths_cached(self.mboard_eeprom_addr)[self.mboard_eeprom_path_index],
                 self.mboard_eeprom_offset,
                 e31x_legacy_eeprom.MboardEEPROM.eeprom_header_format,
                 e31x_legacy_eeprom.MboardEEPROM.eeprom_header_keys,
                 self.mboard_eeprom_max_len
             )
-            self.log.trace("Found EEPROM metadata: `{}'"
-                           .format(str(eeprom_head)))
-            self.log.trace("Read {} bytes of EEPROM data."
-                           .format(len(eeprom_rawdata)))
+            self.log.trace("Found EEPROM metadata: `%s'", eeprom_head)
+            self.log.trace("Read %d bytes of EEPROM data.",
+                           len(eeprom_rawdata))
             return eeprom_head, eeprom_rawdata
         # Nothing defined? Return defaults.
         self.log.trace("No mboard EEPROM path defined. "
@@ -328,13 +346,13 @@ class e31x(ZynqComponents, PeriphManagerBase):
                               if isinstance(self.dboard_eeprom_addr, list) \
                               else [self.dboard_eeprom_addr]
         dboard_eeprom_paths = []
-        self.log.trace("Identifying dboard EEPROM paths from addrs `{}'..."
-                       .format(",".join(dboard_eeprom_addrs)))
+        self.log.trace("Identifying dboard EEPROM paths from addrs `%s'...",
+                       ",".join(dboard_eeprom_addrs))
         for dboard_eeprom_addr in dboard_eeprom_addrs:
             self.log.trace("Resolving %s...", dboard_eeprom_addr)
-            dboard_eeprom_paths += get_eeprom_paths(dboard_eeprom_addr)
-        self.log.trace("Found dboard EEPROM paths: {}"
-                       .format(",".join(dboard_eeprom_paths)))
+            dboard_eeprom_paths += get_eeprom_paths_cached(dboard_eeprom_addr)
+        self.log.trace("Found dboard EEPROM paths: %s",
+                       ",".join(dboard_eeprom_paths))
         if len(dboard_eeprom_paths) > self.max_num_dboards:
             self.log.warning("Found more EEPROM paths than daughterboards. "
                              "Ignoring some of them.")
@@ -350,16 +368,15 @@ class e31x(ZynqComponents, PeriphManagerBase):
                 e31x_legacy_eeprom.DboardEEPROM.eeprom_header_keys,
                 self.dboard_eeprom_max_len
             )
-            self.log.trace("Found dboard EEPROM metadata: `{}'"
-                           .format(str(dboard_eeprom_md)))
+            self.log.trace("Found dboard EEPROM metadata: `%s'",
+                           dboard_eeprom_md)
             self.log.trace("Read %d bytes of dboard EEPROM data.",
                            len(dboard_eeprom_rawdata))
             db_pid = dboard_eeprom_md.get('pid')
             if db_pid is None:
                 self.log.warning("No dboard PID found in dboard EEPROM!")
             else:
-                self.log.debug("Found dboard PID in EEPROM: 0x{:04X}"
-                               .format(db_pid))
+                self.log.debug("Found dboard PID in EEPROM: 0x%04X", db_pid)
             dboard_info.append({
                 'eeprom_md': dboard_eeprom_md,
                 'eeprom_rawdata': dboard_eeprom_rawdata,
@@ -398,7 +415,7 @@ class e31x(ZynqComponents, PeriphManagerBase):
         if "no_reload_fpga" in args:
             self._do_not_reload = str2bool(args.get("no_reload_fpga")) or args.get("no_reload_fpga") == ""
         result = super(e31x, self).init(args)
-        for xport_mgr in itervalues(self._xport_mgrs):
+        for xport_mgr in self._xport_mgr_list:
             xport_mgr.init(args)
         return result
 
@@ -407,29 +424,28 @@ class e31x(ZynqComponents, PeriphManagerBase):
         """
         Load all overlays required to go into idle power savings mode.
         """
-        idle_overlay = self.get_idle_dt_overlay(self.device_info)
-        self.log.debug("Motherboard requests device tree overlay for Idle power savings mode: {}".format(
-            idle_overlay
-        ))
+        idle_overlay = self._idle_overlay
+        self.log.debug("Motherboard requests device tree overlay for Idle "
+                       "power savings mode: %s", idle_overlay)
         dtoverlay.apply_overlay_safe(idle_overlay)
 
     def remove_idle_overlay(self):
         """
         Remove idle mode overlay.
         """
-        idle_overlay = self.get_idle_dt_overlay(self.device_info)
-        self.log.trace("Removing Idle overlay: {}".format(
-            idle_overlay
-        ))
+        idle_overlay = self._idle_overlay
+        self.log.trace("Removing Idle overlay: %s", idle_overlay)
         dtoverlay.rm_overlay(idle_overlay)
 
     def list_owned_overlays(self):
         """
         Lists all overlays that can be possibly applied by MPM.
         """
-        all_overlays = self.list_required_dt_overlays(self.device_info)
-        all_overlays.append(self.get_idle_dt_overlay(self.device_info))
-        return all_overlays
+        if self._owned_overlays is None:
+            self._owned_overlays = \
+                tuple(self.list_required_dt_overlays(self.device_info)) + \
+                (self._idle_overlay,)
+        return list(self._owned_overlays)
 
     def deinit(self):
         """
@@ -440,7 +456,7 @@ class e31x(ZynqComponents, PeriphManagerBase):
                 "Cannot run deinit(), device was never fully initialized!")
             return
         super(e31x, self).deinit()
-        for xport_mgr in itervalues(self._xport_mgrs):
+        for xport_mgr in self._xport_mgr_list:
             xport_mgr.deinit()
         self.log.trace("Resetting SID pool...")
         self._available_endpoints = list(range(256))
@@ -461,10 +477,19 @@ class e31x(ZynqComponents, PeriphManagerBase):
         self.dboard = None
         self.mboard_regs_control = None
         self._device_initialized = False
+        # The sensor devices go away with the overlays
+        for probe_fd in self._sensor_probe_fds.values():
+            os.close(probe_fd)
+        self._sensor_probe_fds = {}
+        self._sensor_paths = {}
+        self._temp_sensor_cache = {}
+        # Release the resources held by the base class (crossbar file
+        # descriptors, the dboard init thread pool, cached udev lookups)
+        # before the overlays, and with them the devices, go away
+        super(e31x, self).tear_down()
         active_overlays = self.list_active_overlays()
-        self.log.trace("E310 has active device tree overlays: {}".format(
-            active_overlays
-        ))
+        self.log.trace("E310 has active device tree overlays: %s",
+                       active_overlays)
         for overlay in active_overlays:
             dtoverlay.rm_overlay(overlay)
         self.apply_idle_overlay()
@@ -474,7 +499,7 @@ class e31x(ZynqComponents, PeriphManagerBase):
         Determine if the device is in the idle state.
         """
         active_overlays = self.list_active_overlays()
-        idle_overlay = self.get_idle_dt_overlay(self.device_info)
+        idle_overlay = self._idle_overlay
         is_idle = idle_overlay in active_overlays
         if is_idle:
             self.log.trace("Found idle overlay: %s", idle_overlay)
@@ -556,7 +581,7 @@ class e31x(ZynqComponents, PeriphManagerBase):
     def get_clock_sources(self):
         " Lists all available clock sources. "
         self.log.trace("Listing available clock sources...")
-        return ('internal',)
+        return E310_CLOCK_SOURCES
 
     def get_clock_source(self):
         " Returns the currently selected clock source "
@@ -569,17 +594,17 @@ class e31x(ZynqComponents, PeriphManagerBase):
         Throws if clock_source is not a valid value.
         """
         clock_source = args[0]
-        assert clock_source in self.get_clock_sources()
-        self.log.debug("Setting clock source to `{}'".format(clock_source))
-        if clock_source == self.get_clock_source():
+        if clock_source == self._clock_source:
             self.log.trace("Nothing to do -- clock source already set.")
             return
+        assert clock_source in E310_CLOCK_SOURCES
+        self.log.debug("Setting clock source to `%s'", clock_source)
         self._clock_source = clock_source
         self.mboard_regs_control.set_clock_source(clock_source)
 
     def get_time_sources(self):
         " Returns list of valid time sources "
-        return ['internal', 'external', 'gpsdo']
+        return list(E310_TIME_SOURCES)
 
     def get_time_source(self):
         " Return the currently selected time source "
@@ -587,10 +612,10 @@ class e31x(ZynqComponents, PeriphManagerBase):
 
     def set_time_source(self, time_source):
         " Set a time source "
-        assert time_source in self.get_time_sources()
-        if time_source == self.get_time_source():
+        if time_source == self._time_source:
             self.log.trace("Nothing to do -- time source already set.")
             return
+        assert time_source in E310_TIME_SOURCES
         self._time_source = time_source
         self.mboard_regs_control.set_time_source(time_source)
 
@@ -647,54 +672,110 @@ class e31x(ZynqComponents, PeriphManagerBase):
             'name': 'ref_locked',
             'type': 'BOOLEAN',
             'unit': 'locked' if lock_status else 'unlocked',
-            'value': str(lock_status).lower(),
+            'value': 'true' if lock_status else 'false',
         }
 
-    def get_mb_temp_sensor(self):
+    def _get_sensor_path(self, sensor_type, subsystem):
         """
-        Get temperature sensor reading of the E310.
+        Return the sysfs path of the sensor device whose name is sensor_type.
+
+        Finding it requires walking the entire subsystem, so the path is only
+        looked up once, and then cached until tear_down().
+        """
+        if sensor_type not in self._sensor_paths:
+            self._sensor_paths[sensor_type] = get_sysfs_sensor_paths(
+                sensor_type, subsystem, 'name')[0]
+        return self._sensor_paths[sensor_type]
+
+    def _read_sensor_probes(self, sensor_type, subsystem, data_probes):
+        """
+        Return a dictionary with the float values of the given data probes of
+        the sensor device sensor_type.
+
+        The probe files are kept open until tear_down(), so every reading
+        only costs a single pread() per probe.
+        """
+        probe_values = {}
+        for data_probe in data_probes:
+            probe_key = (sensor_type, data_probe)
+            if probe_key not in self._sensor_probe_fds:
+                self._sensor_probe_fds[probe_key] = os.open(
+                    os.path.join(
+                        self._get_sensor_path(sensor_type, subsystem),
+                        data_probe),
+                    os.O_RDONLY)
+            # float() parses the ASCII bytes and ignores the trailing newline
+            probe_values[data_probe] = \
+                float(os.pread(self._sensor_probe_fds[probe_key], 64, 0))
+        return probe_values
+
+    def _get_temp_sensor(self, sensor_name, read_temp):
+        """
+        Return the sensor dictionary for the temperature sensor sensor_name.
+
+        Temperatures change slowly compared to how often clients may poll
+        them, so read_temp() (which returns the temperature as a string) is
+        only called again once the last reading is older than
+        E310_TEMP_SENSOR_MAX_AGE seconds.
+        """
+        now = time.monotonic()
+        timestamp, temp = self._temp_sensor_cache.get(sensor_name, (0, None))
+        if temp is None or now - timestamp > E310_TEMP_SENSOR_MAX_AGE:
+            temp = read_temp()
+            self._temp_sensor_cache[sensor_name] = (now, temp)
+        return {
+            'name': sensor_name,
+            'type': 'REALNUM',
+            'unit': 'C',
+            'value': temp
+        }
+
+    def _read_mb_temp(self):
+        """
+        Read the motherboard temperature from the hwmon device.
         """
         self.log.trace("Reading temperature.")
         temp = '-1'
-        raw_val = {}
+        sensor_type = 'jc-42.4-temp'
         data_probes = ['temp1_input']
         try:
-            for data_probe in data_probes:
-                raw_val[data_probe] = read_sysfs_sensors_value('jc-42.4-temp', data_probe, 'hwmon', 'name')[0]
+            raw_val = self._read_sensor_probes(
+                sensor_type, 'hwmon', data_probes)
             temp = str(raw_val['temp1_input'] / 1000)
         except ValueError:
             self.log.warning("Error when converting temperature value")
-        except KeyError:
-            self.log.warning("Can't read temp on thermal_zone".format(sensor))
-        return {
-            'name': 'temp_mb',
-            'type': 'REALNUM',
-            'unit': 'C',
-            'value': temp
-        }
+        except (KeyError, OSError):
+            self.log.warning("Can't read temp on %s", sensor_type)
+        return temp
 
-    def get_fpga_temp_sensor(self):
+    def _read_fpga_temp(self):
         """
-        Get temperature sensor reading of the E310.
+        Read the FPGA temperature from the XADC.
         """
         self.log.trace("Reading temperature.")
         temp = '-1'
-        raw_val = {}
+        sensor_type = 'xadc'
         data_probes = ['in_temp0_raw', 'in_temp0_scale', 'in_temp0_offset']
         try:
-            for data_probe in data_probes:
-                raw_val[data_probe] = read_sysfs_sensors_value('xadc', data_probe, 'iio', 'name')[0]
+            raw_val = self._read_sensor_probes(sensor_type, 'iio', data_probes)
             temp = str((raw_val['in_temp0_raw'] + raw_val['in_temp0_offset']) * raw_val['in_temp0_scale'] / 1000)
         except ValueError:
             self.log.warning("Error when converting temperature value")
-        except KeyError:
-            self.log.warning("Can't read temp on thermal_zone".format(sensor))
-        return {
-            'name': 'temp_fpga',
-            'type': 'REALNUM',
-            'unit': 'C',
-            'value': temp
-        }
+        except (KeyError, OSError):
+            self.log.warning("Can't read temp on %s", sensor_type)
+        return temp
+
+    def get_mb_temp_sensor(self):
+        """
+        Get temperature sensor reading of the E310.
+        """
+        return self._get_temp_sensor('temp_mb', self._read_mb_temp)
+
+    def get_fpga_temp_sensor(self):
+        """
+        Get temperature sensor reading of the E310.
+        """
+        return self._get_temp_sensor('temp_fpga', self._read_fpga_temp)
 
     ###########################################################################
     # EEPROMs
@@ -723,10 +804,11 @@ class e31x(ZynqComponents, PeriphManagerBase):
         See PeriphManagerBase.get_db_eeprom() for docs.
         """
         if dboard_idx != E310_DBOARD_SLOT_IDX:
-            self.log.warn("Trying to access invalid dboard index {}. "
-                          "Using the only dboard.".format(dboard_idx))
-        db_eeprom_data = copy.copy(self.dboard.device_info)
-        return db_eeprom_data
+            self.log.warn("Trying to access invalid dboard index %s. "
+                          "Using the only dboard.", dboard_idx)
+        # Like get_mb_eeprom(), this goes straight to the RPC client, which
+        # only serializes it, so there's no need to copy it
+        return self.dboard.device_info
 
     def set_db_eeprom(self, dboard_idx, eeprom_data):
         self.log.warn("Called set_db_eeprom(), but not implemented!")
@@ -740,5 +822,5 @@ class e31x(ZynqComponents, PeriphManagerBase):
     def _update_fpga_type(self):
         """Update the fpga type stored in the updateable components"""
         fpga_type = self.mboard_regs_control.get_fpga_type()
-        self.log.debug("Updating mboard FPGA type info to {}".format(fpga_type))
-        self.updateable_components['fpga']['type'] = fpga_type
+        self.log.debug("Updating mboard FPGA type info to %s", fpga_type)
+        self._set_component_metadata('fpga', 'type', fpga_type)
@@ -8,11 +8,9 @@ E320 implementation module
 """
 
 from __future__ import print_function
-import bisect
 import copy
 import re
 import threading
-from six import iteritems, itervalues
 from usrp_mpm.components import ZynqComponents
 from usrp_mpm.dboard_manager import Neon
 from usrp_mpm.gpsd_iface import GPSDIfaceExtension
@@ -21,8 +19,8 @@ from usrp_mpm.mpmutils import assert_compat_number, str2bool
 from usrp_mpm.periph_manager import PeriphManagerBase
 from usrp_mpm.rpc_server import no_rpc
 from usrp_mpm.sys_utils import dtoverlay
+from usrp_mpm.sys_utils.udev import get_spidev_nodes_cached
 from usrp_mpm.sys_utils.sysfs_thermal import read_thermal_sensor_value, read_thermal_sensors_value
-from usrp_mpm.sys_utils.udev import get_spidev_nodes
 from usrp_mpm.xports import XportMgrUDP, XportMgrLiberio
 from usrp_mpm.periph_manager.e320_periphs import MboardRegsControl
 
@@ -174,8 +172,8 @@ class e320(ZynqComponents, PeriphManagerBase):
         # Set up the SPI nodes
         spi_nodes = []
         for spi_addr in self.dboard_spimaster_addrs:
-            for spi_node in get_spidev_nodes(spi_addr):
-                bisect.insort(spi_nodes, spi_node)
+            spi_nodes.extend(get_spidev_nodes_cached(spi_addr))
+        spi_nodes.sort()
         self.log.trace("Found spidev nodes: {0}".format(spi_nodes))
 
         if not spi_nodes:
@@ -199,7 +197,7 @@ class e320(ZynqComponents, PeriphManagerBase):
         ))
         assert_compat_number(
             E320_FPGA_COMPAT,
-            self.mboard_regs_control.get_compat_number(),
+            actual_compat,
             component="FPGA",
             fail_on_old_minor=True,
             log=self.log
@@ -309,7 +307,7 @@ class e320(ZynqComponents, PeriphManagerBase):
                 # Extract the sensor name from the getter
                 sensor_name = re.search(r"get_(.*)_sensor", method_name).group(1)
                 # Register it with the MB sensor framework
-                self.mboard_sensor_callback_map[sensor_name] = method_name
+                self._register_mb_sensor(sensor_name, method_name)
                 self.log.trace("Adding %s sensor function", sensor_name)
             except AttributeError:
                 # re.search will return None is if can't find the sensor name
@@ -332,7 +330,7 @@ class e320(ZynqComponents, PeriphManagerBase):
         if args.get("time_source", "") != "":
             self.set_time_source(args.get("time_source"))
         result = super(e320, self).init(args)
-        for xport_mgr in itervalues(self._xport_mgrs):
+        for xport_mgr in self._xport_mgrs.values():
             xport_mgr.init(args)
         return result
 
@@ -345,7 +343,7 @@ class e320(ZynqComponents, PeriphManagerBase):
                 "Cannot run deinit(), device was never fully initialized!")
             return
         super(e320, self).deinit()
-        for xport_mgr in itervalues(self._xport_mgrs):
+        for xport_mgr in self._xport_mgrs.values():
             xport_mgr.deinit()
         self.log.trace("Resetting SID pool...")
         self._available_endpoints = list(range(256))
@@ -362,6 +360,10 @@ class e320(ZynqComponents, PeriphManagerBase):
             self._status_monitor_thread.join(3 * E320_MONITOR_THREAD_INTERVAL)
             if self._status_monitor_thread.is_alive():
                 self.log.error("Could not terminate monitor thread! This could result in resource leaks.")
+        # Release the resources held by the base class (crossbar file
+        # descriptors, the dboard init thread pool, cached udev lookups)
+        # before the overlays, and with them the devices, go away
+        super(e320, self).tear_down()
         active_overlays = self.list_active_overlays()
         self.log.trace("E320 has active device tree overlays: {}".format(
             active_overlays
@@ -637,7 +639,7 @@ class e320(ZynqComponents, PeriphManagerBase):
         except ValueError:
             self.log.warning("Error when converting temperature value")
         except KeyError:
-            self.log.warning("Can't read temp on thermal_zone".format(sensor))
+            self.log.warning("Can't read temp on thermal_zone %s", sensor)
         return {
             'name': sensor_name,
             'type': 'REALNUM',
@@ -707,7 +709,7 @@ class e320(ZynqComponents, PeriphManagerBase):
             self.log.warn("Trying to access invalid dboard index {}. "
                           "Using the only dboard.".format(dboard_idx))
         db_eeprom_data = copy.copy(self.dboard.device_info)
-        for blob_id, blob in iteritems(self.dboard.get_user_eeprom_data()):
+        for blob_id, blob in self.dboard.get_user_eeprom_data().items():
             if blob_id in db_eeprom_data:
                 self.log.warn("EEPROM user data contains invalid blob ID "
                               "%s", blob_id)
@@ -728,7 +730,7 @@ class e320(ZynqComponents, PeriphManagerBase):
             self.log.warn("Trying to access invalid dboard index {}. "
                           "Using the only dboard.".format(dboard_idx))
         safe_db_eeprom_user_data = {}
-        for blob_id, blob in iteritems(eeprom_data):
+        for blob_id, blob in eeprom_data.items():
             if blob_id in self.dboard.device_info:
                 error_msg = "Trying to overwrite read-only EEPROM " \
                             "entry `{}'!".format(blob_id)
@@ -752,4 +754,4 @@ class e320(ZynqComponents, PeriphManagerBase):
         """Update the fpga type stored in the updateable components"""
         fpga_type = self.mboard_regs_control.get_fpga_type()
         self.log.debug("Updating mboard FPGA type info to {}".format(fpga_type))
-        self.updateable_components['fpga']['type'] = fpga_type
+        self._set_component_metadata('fpga', 'type', fpga_type)
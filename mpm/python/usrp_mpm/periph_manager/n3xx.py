@@ -12,7 +12,6 @@ import copy
 import re
 import threading
 import time
-from six import iteritems, itervalues
 from usrp_mpm.cores import WhiteRabbitRegsControl
 from usrp_mpm.components import ZynqComponents
 from usrp_mpm.gpsd_iface import GPSDIfaceExtension
@@ -270,7 +269,7 @@ class n3xx(ZynqComponents, PeriphManagerBase):
         ))
         assert_compat_number(
             N3XX_FPGA_COMPAT,
-            self.mboard_regs_control.get_compat_number(),
+            actual_compat,
             component="FPGA",
             fail_on_old_minor=True,
             log=self.log
@@ -400,7 +399,7 @@ class n3xx(ZynqComponents, PeriphManagerBase):
                 # Extract the sensor name from the getter
                 sensor_name = re.search(r"get_(.*)_sensor", method_name).group(1)
                 # Register it with the MB sensor framework
-                self.mboard_sensor_callback_map[sensor_name] = method_name
+                self._register_mb_sensor(sensor_name, method_name)
                 self.log.trace("Adding %s sensor function", sensor_name)
             except AttributeError:
                 # re.search will return None is if can't find the sensor name
@@ -448,7 +447,7 @@ class n3xx(ZynqComponents, PeriphManagerBase):
             'pps_export',
             N3XX_DEFAULT_ENABLE_PPS_EXPORT
         ))
-        for xport_mgr in itervalues(self._xport_mgrs):
+        for xport_mgr in self._xport_mgrs.values():
             xport_mgr.init(args)
         return result
 
@@ -461,7 +460,7 @@ class n3xx(ZynqComponents, PeriphManagerBase):
                 "Cannot run deinit(), device was never fully initialized!")
             return
         super(n3xx, self).deinit()
-        for xport_mgr in itervalues(self._xport_mgrs):
+        for xport_mgr in self._xport_mgrs.values():
             xport_mgr.deinit()
         self.log.trace("Resetting SID pool...")
         self._available_endpoints = list(range(256))
@@ -479,6 +478,10 @@ class n3xx(ZynqComponents, PeriphManagerBase):
             if self._status_monitor_thread.is_alive():
                 self.log.error("Could not terminate monitor thread! "
                                "This could result in resource leaks.")
+        # Release the resources held by the base class (crossbar file
+        # descriptors, the dboard init thread pool, cached udev lookups)
+        # before the overlays, and with them the devices, go away
+        super(n3xx, self).tear_down()
         active_overlays = self.list_active_overlays()
         self.log.trace("N3xx has active device tree overlays: {}".format(
             active_overlays
@@ -979,7 +982,7 @@ class n3xx(ZynqComponents, PeriphManagerBase):
         db_eeprom_data = copy.copy(dboard.device_info)
         if hasattr(dboard, 'get_user_eeprom_data') and \
                 callable(dboard.get_user_eeprom_data):
-            for blob_id, blob in iteritems(dboard.get_user_eeprom_data()):
+            for blob_id, blob in dboard.get_user_eeprom_data().items():
                 if blob_id in db_eeprom_data:
                     self.log.warn("EEPROM user data contains invalid blob ID " \
                                   "%s", blob_id)
@@ -1009,7 +1012,7 @@ class n3xx(ZynqComponents, PeriphManagerBase):
             self.log.error(error_msg)
             raise RuntimeError(error_msg)
         safe_db_eeprom_user_data = {}
-        for blob_id, blob in iteritems(eeprom_data):
+        for blob_id, blob in eeprom_data.items():
             if blob_id in dboard.device_info:
                 error_msg = "Trying to overwrite read-only EEPROM " \
                             "entry `{}'!".format(blob_id)
@@ -1043,7 +1046,7 @@ class n3xx(ZynqComponents, PeriphManagerBase):
             if fpga_type == "WX":
                 fpga_type = "XQ"
         self.log.debug("Updating mboard FPGA type info to {}".format(fpga_type))
-        self.updateable_components['fpga']['type'] = fpga_type
+        self._set_component_metadata('fpga', 'type', fpga_type)
 
     #######################################################################
     # Claimer API
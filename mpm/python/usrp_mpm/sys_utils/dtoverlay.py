@@ -86,6 +86,9 @@ def apply_overlay_safe(overlay_name):
     Only apply an overlay if it's not yet applied.
 
     Finally, checks that the overlay was applied and throws an exception if not.
+
+    Returns True if the overlay was newly applied, False if it was already
+    applied before.
     """
     if is_applied(overlay_name):
         get_logger("DTO").debug(
@@ -93,10 +96,11 @@ def apply_overlay_safe(overlay_name):
                 overlay_name
             )
         )
-    else:
-        apply_overlay(overlay_name)
+        return False
+    apply_overlay(overlay_name)
     if not is_applied(overlay_name):
         raise RuntimeError("Failed to apply overlay `{}'".format(overlay_name))
+    return True
 
 def rm_overlay(overlay_name):
     """
@@ -27,6 +27,22 @@ def read_sysfs_sensors_value(sensor_type, data_probe, subsystem, attribute):
                        .match_attribute(attribute, sensor_type)]
     return reading_sensors
 
+def get_sysfs_sensor_paths(sensor_type, subsystem, attribute):
+    """
+    This function will return a list of the sysfs paths of all the devices in
+    the given subsystem whose attribute matches sensor_type. The data probes
+    of a sensor are files within its path, so the udev lookup only needs to
+    happen once per sensor.
+
+    Arguments:
+    sensor_type -- Is "attribute" of udev, see read_sysfs_sensors_value()
+    subsystem -- of the thermal sensor
+    attribute -- matching attribute for the sensor e.g. 'type', 'name'
+    """
+    return [x.sys_path for x in pyudev.Context()
+            .list_devices(subsystem=subsystem)
+            .match_attribute(attribute, sensor_type)]
+
 def read_thermal_sensors_value(sensor_type, data_probe, subsystem='thermal', attribute='type'):
     """
     This function will return a list of all the float value of
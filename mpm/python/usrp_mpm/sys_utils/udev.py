@@ -8,6 +8,7 @@ Utilities for udev lookups
 """
 
 import os
+from functools import lru_cache
 import pyudev
 
 def get_eeprom_paths(address):
@@ -41,3 +42,32 @@ def get_spidev_nodes(spi_master):
         for device in context.list_devices(parent=parent, subsystem="spidev")
     ]
 
+@lru_cache(maxsize=None)
+def get_eeprom_paths_cached(address):
+    """
+    Cached version of get_eeprom_paths(). The EEPROM paths only change when
+    device tree overlays get applied or removed, so the lookup is only done
+    once per I2C address until clear_cached_lookups() is called.
+
+    Callers must not modify the returned list.
+    """
+    return get_eeprom_paths(address)
+
+@lru_cache(maxsize=None)
+def get_spidev_nodes_cached(spi_master):
+    """
+    Cached version of get_spidev_nodes(). The spidev nodes only change when
+    device tree overlays get applied or removed, so the lookup is only done
+    once per SPI master until clear_cached_lookups() is called.
+
+    Callers must not modify the returned list.
+    """
+    return get_spidev_nodes(spi_master)
+
+def clear_cached_lookups():
+    """
+    Forget all cached udev lookups. This needs to be called whenever the
+    device tree overlays change.
+    """
+    get_eeprom_paths_cached.cache_clear()
+    get_spidev_nodes_cached.cache_clear()